@@ -1,122 +1,153 @@
 from pathlib import Path
+import argparse
 import os
 import sqlite3
 import sys
 import time
 
-from .db import build_db
-from .curve import Curve, is_curve_template
-from .faction import Faction, is_faction_template
-from .item import Item, is_item_template
-from .unit import Unit, is_unit_template
-from .pet import Pet, is_pet_template
-from .talent import Talent, is_talent_template
-from .power import Power, is_power_template
-from .pet_talents import PetTalent, is_pet_talent_template
-from .pet_powers import PetPower, is_pet_power_template
+from .build_cache import BuildCache
+from .curve import CurveRegistry
+from .db import build_db, WRITERS
+from .export import export_db, BATCH_SIZE, FORMATS
+from .lang_files import load_locales
+from .patch import apply_patch, PatchError
+from .scan import list_entries, scan_entries, scan_entries_parallel, group_records, load_lang_dependencies, resolve_units
 from .state import State
 from .utils import ROOT, ROOT_WAD, TYPES
+from .vdf import collect_vdfs
 
 ITEMS_DB = ROOT / "items.db"
-LOCALE = "Locale/English"
-
-
-def deserialize_files(state: State):
-    curves = []
-    factions = []
-    items = []
-    units = []
-    pets = []
-    talents = []
-    powers = []
-    pet_talents = []
-    pet_powers = []
-    vdfs = []
-
-    for file in state.de.archive.iter_glob("ObjectData/**/*.xml"):
-        obj = state.de.deserialize_from_path(file)
-
-        if obj == None:
-            continue
-
-        if is_curve_template(obj):
-            curve = Curve(state, obj)
-            curves.append(curve)
-    
-    for file in state.de.archive.iter_glob("Factions/**/*.xml"):
-        obj = state.de.deserialize_from_path(file)
-
-        if obj == None:
-            continue
-
-        if is_faction_template(obj):
-            faction = Faction(state, obj)
-            factions.append(faction)
-                
-    for file in state.de.archive.iter_glob("ObjectData/**/*.xml"):
-        obj = state.de.deserialize_from_path(file)
-
-        if obj == None:
-            continue
-        
-        if is_item_template(obj):
-            item = Item(state, obj)
-            if item.vdf != "" and (item.vdf_type, item.vdf, item.fallback_icon) not in vdfs:
-                vdfs.append((item.vdf_type, item.vdf, item.fallback_icon))
-            items.append(item)
-
-        if is_unit_template(obj):
-            unit = Unit(state, obj, curves)
-            if unit.vdf != "" and (unit.vdf_type, unit.vdf, unit.fallback_icon) not in vdfs:
-                vdfs.append((unit.vdf_type, unit.vdf, unit.fallback_icon))
-            units.append(unit)
-
-        if is_pet_template(obj):
-            pet = Pet(state, obj)
-            if pet.vdf != "" and (pet.vdf_type, pet.vdf, pet.fallback_icon) not in vdfs:
-                vdfs.append((pet.vdf_type, pet.vdf, pet.fallback_icon))
-            pets.append(pet)
-
-        if is_pet_talent_template(obj):
-            pet_talent = PetTalent(state, obj)
-            pet_talents.append(pet_talent)
-        
-        if is_pet_power_template(obj):
-            pet_power = PetPower(state, obj)
-            pet_powers.append(pet_power)
-
-    for file in state.de.archive.iter_glob("Talents/*.xml"):
-        obj = state.de.deserialize_from_path(file)
-
-        if is_talent_template(obj):
-            talent = Talent(state, obj)
-            if talent.image != "" and ("Image", talent.vdf, "") not in vdfs:
-                vdfs.append(("Image", talent.vdf, ""))
-            talents.append(talent)
-    
-    for file in state.de.archive.iter_glob("Abilities/*.xml"):
-        obj = state.de.deserialize_from_path(file)
-
-        if is_power_template(obj):
-            power = Power(state, obj)
-            if power.image != "" and ("Image", power.vdf, "") not in vdfs:
-                vdfs.append(("Image", power.vdf, ""))
-            powers.append(power)
-
-    return curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs
+BUILD_CACHE = ROOT / "build_cache.pickle"
+PRIMARY_LOCALE = "English"
+
+
+def deserialize_files(state: State, jobs: int = 1, cache: BuildCache = None):
+    entries = list_entries(state)
+    pending = entries
+    if cache is not None:
+        pending = [entry for entry in entries if not cache.is_fresh(entry[0])]
+        print(f"Reusing {len(entries) - len(pending)} cached entries, deserializing {len(pending)}")
+
+    if jobs > 1 and len(pending) > 0:
+        scanned = scan_entries_parallel(state, pending, jobs)
+    else:
+        scanned = scan_entries(state, pending)
+
+    if cache is not None:
+        cache.update(scanned)
+        # Reused entries still need the strings their lang keys point at
+        fresh = {path for path, _, _ in scanned}
+        reused = [path for path, _ in entries if path not in fresh]
+        load_lang_dependencies(state, cache.dependencies(reused))
+
+        scanned = cache.collect(entries)
+        cache.save(entries)
+    groups = group_records(scanned)
+    curves = CurveRegistry(groups["curve"])
+    resolve_units(groups["unit"], curves)
+    vdfs = collect_vdfs(scanned)
+
+    return (
+        curves,
+        groups["faction"],
+        groups["item"],
+        groups["unit"],
+        groups["pet"],
+        groups["talent"],
+        groups["power"],
+        groups["pet_talent"],
+        groups["pet_power"],
+        vdfs,
+    )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="piratedb", description="Builds an SQLite database of items directly from game files.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes used to deserialize templates")
+    parser.add_argument("--preload-locale", action="store_true", help="parse every .lang file up front in a process pool before extracting templates, ignored with --jobs")
+    parser.add_argument("--incremental", action="store_true", help="only deserialize archive entries that changed since the last build")
+    parser.add_argument("--cache", type=Path, default=BUILD_CACHE, help="build cache used by --incremental")
+    parser.add_argument("--locale-strings", choices=["all", "referenced"], default="all", help="write every loaded locale string, or only those referenced by exported rows")
+    parser.add_argument("--writer", choices=WRITERS, default="direct", help="write the database straight to disk, or build it in memory and back it up")
+    parser.add_argument("--keep", type=int, default=0, metavar="N", help="keep the N previous databases as items.<timestamp>.db")
+    parser.add_argument("--patch", type=Path, metavar="PATH", help="also write the changes from the previous items.db to PATH, see apply-patch")
+    parser.add_argument("--locales", nargs="+", default=[PRIMARY_LOCALE], metavar="LOCALE", help="locale directories to export into locale_<code> tables, e.g. English German French")
+    args = parser.parse_args(argv)
+
+    for locale in args.locales:
+        if not locale.isalnum():
+            parser.error(f"invalid locale name: {locale}")
+    # English resolves every lang key, so it's always built and comes first
+    args.locales = [PRIMARY_LOCALE, *dict.fromkeys(locale for locale in args.locales if locale != PRIMARY_LOCALE)]
+    return args
+
+def apply_patch_main(argv):
+    parser = argparse.ArgumentParser(prog="piratedb apply-patch", description="Updates a database in place with a patch written by --patch.")
+    parser.add_argument("patch", type=Path)
+    parser.add_argument("database", type=Path, nargs="?", default=ITEMS_DB)
+    args = parser.parse_args(argv)
+
+    try:
+        apply_patch(args.patch, args.database)
+    except (PatchError, sqlite3.Error) as e:
+        parser.exit(1, f"{parser.prog}: {e}\n")
+    print(f"Applied {args.patch} to {args.database.absolute()}")
+
+def export_main(argv):
+    parser = argparse.ArgumentParser(prog="piratedb export", description="Exports every table and a few denormalized views to columnar files.")
+    parser.add_argument("out", type=Path, help="directory the files are written to")
+    parser.add_argument("--format", choices=FORMATS, default="parquet", help="Parquet or Arrow IPC files")
+    parser.add_argument("--database", type=Path, default=ITEMS_DB)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per record batch")
+    args = parser.parse_args(argv)
+
+    try:
+        export_db(args.database, args.out, args.format, args.batch_size)
+    except RuntimeError as e:
+        parser.exit(1, f"{parser.prog}: {e}\n")
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(prog="piratedb serve", description="Serves the database as JSON over HTTP.")
+    parser.add_argument("--database", type=Path, default=ITEMS_DB)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", type=int, default=4, help="threads running SQLite queries")
+    args = parser.parse_args(argv)
+
+    if not args.database.exists():
+        parser.exit(1, f"{parser.prog}: {args.database} doesn't exist, build it first\n")
+    # Imported here so building doesn't load the server
+    from .query.server import serve
+    serve(args.database, args.host, args.port, args.threads)
+
+COMMANDS = {
+    "apply-patch": apply_patch_main,
+    "export": export_main,
+    "serve": serve_main,
+}
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+
+    args = parse_args()
     start = time.time()
     
-    state = State(ROOT_WAD, TYPES)
-    curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs = deserialize_files(state)
-
-    if ITEMS_DB.exists():
-        ITEMS_DB.unlink()
-
-    db = sqlite3.connect(str(ITEMS_DB))
-    build_db(state, curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs, db)
-    db.close()
+    state = State(ROOT_WAD, TYPES, locales=args.locales)
+    if args.preload_locale and args.jobs > 1:
+        # Workers load the files they need themselves and never see this lookup
+        print("--preload-locale has no effect with --jobs, ignoring it", file=sys.stderr)
+    elif args.preload_locale:
+        state.cache.preload()
+    cache = BuildCache(args.cache, state) if args.incremental else None
+    curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs = deserialize_files(state, max(args.jobs, 1), cache)
+    secondary = [locale for locale in state.locales.values() if locale is not state.cache]
+    if len(secondary) > 0:
+        load_locales(state.cache, secondary, args.jobs if args.jobs > 1 else None)
+
+    build_db(state, curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs, ITEMS_DB, args.locale_strings == "referenced", args.writer, args.keep, args.patch)
+    pruned = state.cache.store.prune()
+    if pruned > 0:
+        print(f"Removed {pruned} stale compiled locale tables")
 
     print(f"Success! Database written to {ITEMS_DB.absolute()} in {round(time.time() - start, 2)} seconds")
 
@@ -0,0 +1,94 @@
+from pathlib import Path
+import hashlib
+import os
+import pickle
+
+from .state import State
+
+CACHE_VERSION = 1
+
+# Archive entries that every extracted template implicitly depends on.
+# Manifest lookups are tracked per template ID instead.
+GLOBAL_DEPENDENCIES = ("CharacterNames.xml",)
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def _code_fingerprint() -> bytes:
+    fingerprint = hashlib.blake2b(digest_size=16)
+    for source in sorted(Path(__file__).parent.glob("*.py")):
+        fingerprint.update(source.read_bytes())
+    return fingerprint.digest()
+
+
+class BuildCache:
+    def __init__(self, path: Path, state: State):
+        self.path = path
+        self.archive = state.de.archive
+        self.tids = state.tids
+        self.hashes = {}
+        self.entries = {}
+
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(_code_fingerprint())
+        fingerprint.update(Path(state.types).read_bytes())
+        for dependency in GLOBAL_DEPENDENCIES:
+            fingerprint.update(self.content_hash(dependency) or b"")
+        self.fingerprint = fingerprint.digest()
+
+        if path.exists():
+            try:
+                with open(path, "rb") as f:
+                    cached = pickle.load(f)
+            except Exception:
+                cached = {}
+
+            if cached.get("version") == CACHE_VERSION and cached.get("fingerprint") == self.fingerprint:
+                self.entries = cached["entries"]
+
+    def content_hash(self, path):
+        # ("tid", id) dependencies only care about where the manifest points
+        if isinstance(path, tuple):
+            return self.tids.id_to_file.get(path[1])
+
+        if path not in self.hashes:
+            try:
+                self.hashes[path] = _digest(self.archive[path])
+            except KeyError:
+                self.hashes[path] = None
+        return self.hashes[path]
+
+    def is_fresh(self, path: str) -> bool:
+        cached = self.entries.get(path)
+        if cached is None:
+            return False
+
+        for dependency, digest in cached["deps"].items():
+            if self.content_hash(dependency) != digest:
+                return False
+        return True
+
+    def update(self, scanned: list):
+        for path, records, deps in scanned:
+            self.entries[path] = {
+                "deps": {dependency: self.content_hash(dependency) for dependency in deps},
+                "records": records,
+            }
+
+    def dependencies(self, paths: list) -> set:
+        dependencies = set()
+        for path in paths:
+            dependencies.update(self.entries[path]["deps"])
+        return dependencies
+
+    def collect(self, entries: list) -> list:
+        return [(path, self.entries[path]["records"], set(self.entries[path]["deps"])) for path, _ in entries]
+
+    def save(self, entries: list):
+        # Entries that disappeared from the archive are dropped here
+        current = {path: self.entries[path] for path, _ in entries}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "fingerprint": self.fingerprint, "entries": current}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
@@ -0,0 +1,46 @@
+from .lang_files import LangCache, OtherLangKey
+
+
+class NameTable:
+    """CharacterNames.xml indexed by the "first" key of every name list.
+
+    Lists are kept in table order, together with their position in the
+    table, and their lang keys are resolved once on first use.
+    """
+
+    def __init__(self, character_names, cache: LangCache):
+        self.cache = cache
+        self.lists = {}
+        self.resolved = {}
+        for position, name_list in enumerate(character_names["m_table"]["m_serialValues"]):
+            if name_list == None:
+                continue
+            first = name_list["first"]
+            self.lists.setdefault(first, []).append((position, first, name_list["second"]))
+
+    def find(self, *keys: bytes) -> list:
+        """Name lists stored under any of keys as (position, first, second), in table order."""
+        found = []
+        for key in keys:
+            found.extend(self.lists.get(key, ()))
+        if len(keys) > 1:
+            found.sort(key=lambda name_list: name_list[0])
+        return found
+
+    def lang_keys(self, position: int, second) -> list:
+        if position in self.resolved:
+            keys, used_files = self.resolved[position]
+            # Whoever asks again depends on the same .lang files
+            self.cache.used_files |= used_files
+            return keys
+
+        outer_files = self.cache.used_files
+        self.cache.used_files = set()
+        lang_section = second["m_langSection"]
+        keys = [OtherLangKey(self.cache, lang_section + b"_" + name) for name in second["m_names"]]
+        used_files = self.cache.used_files
+        outer_files.update(used_files)
+        self.cache.used_files = outer_files
+
+        self.resolved[position] = (keys, used_files)
+        return keys
@@ -102,4 +102,50 @@ class Curve:
             for talent in talent_behavior["m_talents"]:
                 self.talent_list.append(talent["m_talentID"])
                 self.talent_sources.append(talent["m_source"])
-                self.talent_ranks.append(talent["m_rank"])
\ No newline at end of file
+                self.talent_ranks.append(talent["m_rank"])
+
+class CurveRegistry:
+    def __init__(self, curves: list[Curve]):
+        self.curves = curves
+        self.by_id = {}
+        for curve in curves:
+            self.by_id.setdefault(curve.template_id, curve)
+
+    def __iter__(self):
+        return iter(self.curves)
+
+    def __len__(self) -> int:
+        return len(self.curves)
+
+    def get(self, template_id) -> Curve:
+        return self.by_id.get(int(template_id))
+
+    def school(self, template_id) -> str:
+        curve = self.get(template_id)
+        if curve is None:
+            return "Universal"
+        return curve.school
+
+    def points(self, template_id) -> list:
+        curve = self.get(template_id)
+        if curve is None:
+            return []
+
+        points = []
+        for stat, (level, value) in zip(curve.curve_stats, curve.curve_points):
+            points.append((stat, "Regular", level, value))
+        for stat, (level, value) in zip(curve.curve_bonus_stats, curve.curve_bonus_points):
+            points.append((stat, "Bonus", level, value))
+        return points
+
+    def abilities(self, template_id) -> list:
+        curve = self.get(template_id)
+        if curve is None:
+            return []
+
+        abilities = []
+        for power, source in zip(curve.power_list, curve.power_sources):
+            abilities.append((power, "Power", -1, source))
+        for talent, rank, source in zip(curve.talent_list, curve.talent_ranks, curve.talent_sources):
+            abilities.append((talent, "Talent", rank, source))
+        return abilities
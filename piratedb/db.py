@@ -1,14 +1,33 @@
+from datetime import datetime, timezone
+from pathlib import Path
+import os
+import re
+import shutil
 import sqlite3
+import time
+import uuid
 from sqlite3 import Cursor
 
-from .lang_files import LangCache
+from .curve import CurveRegistry
+from .lang_files import LangCache, lang_ref
+from .patch import write_patch, PatchError
+from .utils import fnv_1a
+from .vdf import VdfRegistry
 
-INIT_QUERIES = """CREATE TABLE locale_en (
+# One per --locales entry, all keyed by the same lang key hashes as locale_en
+LOCALE_QUERIES = """CREATE TABLE locale_{code} (
     id   integer not null primary key,
     data text not null
 );
+"""
+
+LOCALE_INDEX_QUERIES = """CREATE INDEX {code}_name_lookup ON locale_{code}(data);
+"""
 
-CREATE INDEX en_name_lookup ON locale_en(data);
+INIT_QUERIES = """CREATE TABLE build_info (
+    build_id    text not null,
+    built_at    text not null
+);
 
 CREATE TABLE random_names (
     id      integer not null primary key,
@@ -65,8 +84,10 @@ CREATE TABLE items (
     equip_level        integer,
     equip_talent       integer,
     equip_talent_rank  integer,
+    vdf                integer,
 
     foreign key(name)   references locale_en(id)
+    foreign key(vdf)    references vdfs(id)
 );
 
 CREATE TABLE item_stats (
@@ -80,8 +101,6 @@ CREATE TABLE item_stats (
     foreign key(item)   references items(id)
 );
 
-CREATE INDEX item_stat_lookup ON item_stats(item);
-
 CREATE TABLE powers (
     id              integer not null primary key,
     name            integer,
@@ -92,9 +111,11 @@ CREATE TABLE powers (
     pvp_tag         integer,
     target_type     integer,
     target_style    text,
+    vdf             integer,
 
     foreign key(name)   references locale_en(id)
     foreign key(description)    references locale_en(id)
+    foreign key(vdf)    references vdfs(id)
 );
 
 CREATE TABLE power_adjustments (
@@ -131,8 +152,10 @@ CREATE TABLE talents (
     image           text,
 
     ranks           integer,
+    vdf             integer,
 
     foreign key(name)   references locale_en(id)
+    foreign key(vdf)    references vdfs(id)
 );
 
 
@@ -155,8 +178,6 @@ CREATE TABLE talent_ranks (
     foreign key(description)    references locale_en(id)
 );
 
-CREATE INDEX talent_rank_lookup ON talent_ranks(talent);
-
 CREATE TABLE talent_stats (
     id              integer not null primary key,
     talent          integer not null,
@@ -186,9 +207,11 @@ CREATE TABLE units (
     primary_attack      integer,
     has_power_behavior  integer,
     is_random_name      integer,
+    vdf                 integer,
 
     foreign key(name)   references locale_en(id)
     foreign key(title)  references locale_en(id)
+    foreign key(vdf)    references vdfs(id)
 );
 
 
@@ -204,9 +227,6 @@ CREATE TABLE unit_talents (
     foreign key(unit)   references units(id)
 );
 
-CREATE INDEX unit_talent_lookup ON unit_talents(unit);
-
-
 CREATE TABLE unit_stats (
     id       integer not null primary key,
     unit     integer not null,
@@ -218,9 +238,6 @@ CREATE TABLE unit_stats (
     foreign key(unit)   references units(id)
 );
 
-CREATE INDEX unit_stats_lookup ON unit_stats(unit);
-
-
 CREATE TABLE unit_tags (
     id       integer not null primary key,
     unit     integer not null,
@@ -246,8 +263,10 @@ CREATE TABLE pets (
     grit            integer,
     hp              integer,
     item_flags      integer,
+    vdf             integer,
 
     foreign key(name)   references locale_en(id)
+    foreign key(vdf)    references vdfs(id)
 );
 
 CREATE TABLE pet_talents (
@@ -285,9 +304,6 @@ CREATE TABLE indiv_pet_talents (
     foreign key(pet)    references pets(id)
 );
 
-CREATE INDEX indiv_pet_talent_lookup ON indiv_pet_talents(pet);
-
-
 CREATE TABLE indiv_pet_powers (
     id              integer not null primary key,
     pet             integer not null,
@@ -297,8 +313,6 @@ CREATE TABLE indiv_pet_powers (
     foreign key(pet)    references pets(id)
 );
 
-CREATE INDEX indiv_pet_power_lookup ON indiv_pet_powers(pet);
-
 CREATE TABLE vdfs (
     id      integer not null primary key,
     type    text,
@@ -308,17 +322,164 @@ CREATE TABLE vdfs (
 
 """
 
+# Built once the tables are loaded, so inserts don't pay for index upkeep.
+# Every child table gets an index on its parent column.
+INDEX_QUERIES = """CREATE INDEX random_name_lookup ON random_names(faction);
+CREATE INDEX curve_point_lookup ON curve_points(curve);
+CREATE INDEX curve_ability_lookup ON curve_abilities(curve);
+CREATE INDEX item_stat_lookup ON item_stats(item);
+CREATE INDEX power_adjustment_lookup ON power_adjustments(power);
+CREATE INDEX power_info_lookup ON power_info(power);
+CREATE INDEX talent_rank_lookup ON talent_ranks(talent);
+CREATE INDEX talent_stat_lookup ON talent_stats(talent);
+CREATE INDEX unit_talent_lookup ON unit_talents(unit);
+CREATE INDEX unit_stats_lookup ON unit_stats(unit);
+CREATE INDEX unit_tag_lookup ON unit_tags(unit);
+CREATE INDEX indiv_pet_talent_lookup ON indiv_pet_talents(pet);
+CREATE INDEX indiv_pet_power_lookup ON indiv_pet_powers(pet);
+"""
+
 
 def _progress(_status, remaining, total):
     print(f'Copied {total-remaining} of {total} pages...')
 
 
-def build_db(state, curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs, out):
-    mem = sqlite3.connect(":memory:")
-    cursor = mem.cursor()
+PAGE_SIZE = 8192
+# Pages copied per backup step by the "backup" writer
+BACKUP_PAGES = 4096
+
+# Nothing reads the file until it's renamed into place, so a crash only
+# leaves a temp file behind and durability can be skipped while loading
+BULK_LOAD_PRAGMAS = """PRAGMA page_size = {page_size};
+PRAGMA journal_mode = OFF;
+PRAGMA synchronous = OFF;
+PRAGMA locking_mode = EXCLUSIVE;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -262144;
+""".format(page_size=PAGE_SIZE)
+
+WRITERS = ("direct", "backup")
+
+# Full text index over the English names, prefix indexes serve type-ahead.
+# description holds a power's or talent's description and a unit's title.
+SEARCH_QUERIES = """CREATE VIRTUAL TABLE search USING fts5(
+    name,
+    description,
+    kind UNINDEXED,
+    id UNINDEXED,
+    prefix = '2 3'
+);
 
-    initialize(cursor)
-    insert_locale_data(cursor, state.cache)
+INSERT INTO search(name, description, kind, id)
+SELECT name.data, NULL, 'item', items.id FROM items
+JOIN locale_en name ON name.id = items.name;
+
+INSERT INTO search(name, description, kind, id)
+SELECT name.data, title.data, 'unit', units.id FROM units
+JOIN locale_en name ON name.id = units.name
+LEFT JOIN locale_en title ON title.id = units.title;
+
+INSERT INTO search(name, description, kind, id)
+SELECT name.data, description.data, 'power', powers.id FROM powers
+JOIN locale_en name ON name.id = powers.name
+LEFT JOIN locale_en description ON description.id = powers.description;
+
+INSERT INTO search(name, description, kind, id)
+SELECT name.data, description.data, 'talent', talents.id FROM talents
+JOIN locale_en name ON name.id = talents.name
+LEFT JOIN locale_en description ON description.id = (
+    SELECT ranks.description FROM talent_ranks ranks
+    WHERE ranks.talent = talents.id
+    ORDER BY ranks.rank LIMIT 1
+);
+
+INSERT INTO search(search) VALUES ('optimize');
+"""
+
+
+def build_db(state, curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs, out: Path, referenced_only=False, writer="direct", keep=0, patch: Path = None):
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+
+    if writer == "direct":
+        db = sqlite3.connect(str(tmp))
+    else:
+        db = sqlite3.connect(":memory:")
+    db.executescript(BULK_LOAD_PRAGMAS)
+
+    try:
+        populate(db.cursor(), state, curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs, referenced_only)
+        db.commit()
+
+        if writer == "backup":
+            disk = sqlite3.connect(str(tmp))
+            with disk:
+                db.backup(disk, pages=BACKUP_PAGES)
+            disk.close()
+    except:
+        db.close()
+        if tmp.exists():
+            tmp.unlink()
+        raise
+
+    db.close()
+
+    if patch is not None and out.exists():
+        try:
+            changes = write_patch(out, tmp, patch)
+            print(f"Wrote {changes} changed rows to {patch}")
+        except (PatchError, sqlite3.Error) as e:
+            print(f"Couldn't write a patch from the previous build: {e}")
+    publish(tmp, out, keep)
+
+
+def _fsync_dir(path: Path):
+    # Directories can't be opened for syncing on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def previous_builds(out: Path) -> list:
+    """Versioned copies kept by publish, newest first."""
+    pattern = re.compile(rf"{re.escape(out.stem)}\.\d{{8}}-\d{{6}}{re.escape(out.suffix)}")
+    return sorted((path for path in out.parent.glob(f"{out.stem}.*{out.suffix}") if pattern.fullmatch(path.name)), reverse=True)
+
+def publish(tmp: Path, out: Path, keep: int = 0):
+    """Atomically replaces out with the finished database at tmp.
+
+    Readers see either the old or the new file, never a partial one. With
+    keep, the replaced build stays around as <stem>.<timestamp><suffix>
+    and only the keep newest of those are retained.
+    """
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+
+    if keep > 0 and out.exists():
+        # previous_builds only matches this format
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(out.stat().st_mtime))
+        version = out.with_name(f"{out.stem}.{stamp}{out.suffix}")
+        if not version.exists():
+            try:
+                os.link(out, version)
+            except OSError:
+                shutil.copy2(out, version)
+
+    os.replace(tmp, out)
+    _fsync_dir(out.parent)
+
+    if keep > 0:
+        for old in previous_builds(out)[keep:]:
+            old.unlink()
+
+
+def populate(cursor, state, curves, factions, items, units, pets, talents, powers, pet_talents, pet_powers, vdfs, referenced_only=False):
+    initialize(cursor, state.locales)
+    insert_build_info(cursor)
     insert_curves(cursor, curves)
     insert_factions(cursor, factions)
     insert_items(cursor, items)
@@ -329,28 +490,95 @@ def build_db(state, curves, factions, items, units, pets, talents, powers, pet_t
     insert_pet_talents(cursor, pet_talents)
     insert_pet_powers(cursor, pet_powers)
     insert_vdfs(cursor, vdfs)
-    mem.commit()
 
-    with out:
-        mem.backup(out, pages=1)
+    # Written last so the referenced ids can be read back from the rows above
+    ids = referenced_locale_ids(cursor, state.cache) if referenced_only else None
+    for code, cache in state.locales.items():
+        insert_locale_data(cursor, cache, code, ids)
 
-    mem.close()
+    create_search(cursor)
+    create_indexes(cursor, state.locales)
 
 
-def initialize(cursor):
+def initialize(cursor, locales):
+    # locale_en has to exist for the foreign keys in INIT_QUERIES
+    for code in ["en", *(code for code in locales if code != "en")]:
+        cursor.executescript(LOCALE_QUERIES.format(code=code))
     cursor.executescript(INIT_QUERIES)
 
 
-def insert_locale_data(cursor, cache: LangCache):
-    for num in cache.lookup:
-        if "<BR>" in cache.lookup[num]:
-            cache.lookup[num] = cache.lookup[num].replace("<BR>", "")
+def create_search(cursor):
+    try:
+        cursor.executescript(SEARCH_QUERIES)
+    except sqlite3.OperationalError as e:
+        # SQLite builds without FTS5 just don't get a search table
+        print(f"Skipping search table: {e}")
+        cursor.execute("DROP TABLE IF EXISTS search")
+
+
+def create_indexes(cursor, locales):
+    for code in locales:
+        cursor.executescript(LOCALE_INDEX_QUERIES.format(code=code))
+    cursor.executescript(INDEX_QUERIES)
+    cursor.execute("ANALYZE")
+
+
+def insert_build_info(cursor):
+    cursor.execute(
+        "INSERT INTO build_info(build_id, built_at) VALUES (?, ?)",
+        (uuid.uuid4().hex, datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    )
+
+# Columns holding locale_en ids without a foreign key saying so, as
+# (table, column, condition on the row)
+LANG_ID_COLUMNS = (
+    ("talent_ranks", "bottom_left_text", "1"),
+    ("talent_ranks", "bottom_right_text", "1"),
+    ("talent_ranks", "upper_left_text", "1"),
+    # Summon rows keep a template id here, Trap rows the summoned prop's name
+    ("power_info", "summoned", "type = 'Trap'"),
+)
+
+def lang_id_columns(cursor) -> list:
+    """Every (table, column, condition) that points into locale_en."""
+    columns = list(LANG_ID_COLUMNS)
+    tables = [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()]
+    for table in tables:
+        for foreign_key in cursor.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+            # (id, seq, table, from, to, on_update, on_delete, match)
+            if foreign_key[2] == "locale_en":
+                columns.append((table, foreign_key[3], "1"))
+    return columns
+
+def referenced_locale_ids(cursor, cache: LangCache) -> set:
+    ids = set()
+    for table, column, condition in lang_id_columns(cursor):
+        ids.update(row[0] for row in cursor.execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL AND {condition}"))
+
+    # Texts that defer to another key need that key's string as well
+    pending = list(ids)
+    while len(pending) > 0:
+        text = cache.lookup.get(pending.pop())
+        ref = lang_ref(text) if text is not None else None
+        if ref is None:
+            continue
+        ref_id = fnv_1a(ref)
+        if ref_id not in ids:
+            ids.add(ref_id)
+            pending.append(ref_id)
+    return ids
+
+def insert_locale_data(cursor, cache: LangCache, code: str = "en", ids: set = None):
+    if ids is None:
+        rows = cache.lookup.items()
+    else:
+        rows = [(num, cache.lookup[num]) for num in sorted(ids) if num in cache.lookup]
     cursor.executemany(
-        "INSERT INTO locale_en(id, data) VALUES (?, ?)",
-        cache.lookup.items()
+        f"INSERT INTO locale_{code}(id, data) VALUES (?, ?)",
+        rows
     )
 
-def insert_curves(cursor, curves):
+def insert_curves(cursor, curves: CurveRegistry):
     values = []
     points = []
     abilities = []
@@ -362,41 +590,11 @@ def insert_curves(cursor, curves):
             curve.school
         ))
 
-        for point in range(len(curve.curve_points)):
-            points.append((
-                curve.template_id,
-                curve.curve_stats[point],
-                "Regular",
-                curve.curve_points[point][0],
-                curve.curve_points[point][1]
-            ))
-        
-        for bonus in range(len(curve.curve_bonus_points)):
-            points.append((
-                curve.template_id,
-                curve.curve_bonus_stats[bonus],
-                "Bonus",
-                curve.curve_bonus_points[bonus][0],
-                curve.curve_bonus_points[bonus][1]
-            ))
-        
-        for power in range(len(curve.power_list)):
-            abilities.append((
-                curve.template_id,
-                curve.power_list[power],
-                "Power",
-                -1,
-                curve.power_sources[power]
-            ))
-        
-        for talent in range(len(curve.talent_list)):
-            abilities.append((
-                curve.template_id,
-                curve.talent_list[talent],
-                "Talent",
-                curve.talent_ranks[talent],
-                curve.talent_sources[talent]
-            ))
+        for point in curves.points(curve.template_id):
+            points.append((curve.template_id, *point))
+
+        for ability in curves.abilities(curve.template_id):
+            abilities.append((curve.template_id, *ability))
         
     cursor.executemany(
         """INSERT INTO curves(id,real_name,school) VALUES (?,?,?)""",
@@ -474,7 +672,8 @@ def insert_items(cursor, items):
             item.school_req,
             item.level_req,
             item.talent_req,
-            item.talent_req_rank
+            item.talent_req_rank,
+            item.vdf_id
         ))
 
         for stat in range(len(item.stat_effects)):
@@ -522,7 +721,7 @@ def insert_items(cursor, items):
             ))
     
     cursor.executemany(
-        """INSERT INTO items(id,name,real_name,image,item_type,item_flags,equip_school,equip_level,equip_talent,equip_talent_rank) VALUES (?,?,?,?,?,?,?,?,?,?)""",
+        """INSERT INTO items(id,name,real_name,image,item_type,item_flags,equip_school,equip_level,equip_talent,equip_talent_rank,vdf) VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
         values
     )
     cursor.executemany(
@@ -552,7 +751,8 @@ def insert_units(cursor, units):
             unit.unit_type,
             unit.primary_attack,
             unit.has_power_behavior,
-            unit.is_random_name
+            unit.is_random_name,
+            unit.vdf_id
         ))
 
         for stat in range(len(unit.stat_modifiers)):
@@ -588,7 +788,7 @@ def insert_units(cursor, units):
             ))
 
     cursor.executemany(
-        "INSERT INTO units(id,name,real_name,image,title,gender,faction,school,dmg_type,primary_stat,curve,kind,primary_attack,has_power_behavior,is_random_name) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "INSERT INTO units(id,name,real_name,image,title,gender,faction,school,dmg_type,primary_stat,curve,kind,primary_attack,has_power_behavior,is_random_name,vdf) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
         values
     )
     cursor.executemany(
@@ -624,7 +824,8 @@ def insert_pets(cursor, pets):
             pet.max_guile,
             pet.max_grit,
             pet.max_hp,
-            pet.item_flags
+            pet.item_flags,
+            pet.vdf_id
         ))
 
         for talent in pet.base_talents:
@@ -640,7 +841,7 @@ def insert_pets(cursor, pets):
             ))
     
     cursor.executemany(
-        "INSERT INTO pets(id,name,real_name,image,strength,agility,will,power,guts,guile,grit,hp,item_flags) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        "INSERT INTO pets(id,name,real_name,image,strength,agility,will,power,guts,guile,grit,hp,item_flags,vdf) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
         values
     )
     cursor.executemany(
@@ -664,7 +865,8 @@ def insert_talents(cursor, talents):
             talent.name.id,
             talent.real_name,
             talent.image,
-            talent.rank_count
+            talent.rank_count,
+            talent.vdf_id
         ))
 
         for description in range(len(talent.descriptions)):
@@ -689,7 +891,7 @@ def insert_talents(cursor, talents):
             ))
     
     cursor.executemany(
-        "INSERT INTO talents(id,name,real_name,image,ranks) VALUES (?,?,?,?,?)",
+        "INSERT INTO talents(id,name,real_name,image,ranks,vdf) VALUES (?,?,?,?,?,?)",
         values
     )
     cursor.executemany(
@@ -716,7 +918,8 @@ def insert_powers(cursor, powers):
             power.description.id,
             power.pvp_tag,
             power.target_type,
-            power.target_style
+            power.target_style,
+            power.vdf_id
         ))
 
         counts = [0, 0, 0, 0, 0, 0, 0, 0, 0]
@@ -909,7 +1112,7 @@ def insert_powers(cursor, powers):
             counts[type] += 1
     
     cursor.executemany(
-        "INSERT INTO powers(id,name,real_name,image,description,pvp_tag,target_type,target_style) VALUES (?,?,?,?,?,?,?,?)",
+        "INSERT INTO powers(id,name,real_name,image,description,pvp_tag,target_type,target_style,vdf) VALUES (?,?,?,?,?,?,?,?,?)",
         values
     )
     cursor.executemany(
@@ -958,17 +1161,8 @@ def insert_pet_powers(cursor, pet_powers):
         values
     )
 
-def insert_vdfs(cursor, vdfs):
-    values = []
-
-    for vdf in vdfs:
-        values.append((
-            vdf[0],
-            vdf[1],
-            vdf[2]
-        ))
-
+def insert_vdfs(cursor, vdfs: VdfRegistry):
     cursor.executemany(
-        "INSERT INTO vdfs(type,vdf,fallback_icon) VALUES (?,?,?)",
-        values
+        "INSERT INTO vdfs(id,type,vdf,fallback_icon) VALUES (?,?,?,?)",
+        vdfs
     )
@@ -3,6 +3,15 @@ from pathlib import Path
 from katsuba.op import * # type: ignore
 from katsuba.wad import Archive # type: ignore
 
+# Process-wide deserializers, keyed by (root_wad, types_path)
+_SHARED = {}
+
+def get_deserializer(root_wad, types_path: Path) -> "BinDeserializer":
+    key = (str(root_wad), str(types_path))
+    if key not in _SHARED:
+        _SHARED[key] = BinDeserializer(root_wad, types_path)
+    return _SHARED[key]
+
 class BinDeserializer:
     def __init__(self, root_wad, types_path: Path):
         opts = SerializerOptions()
@@ -16,10 +25,29 @@ class BinDeserializer:
 
         self.ser = Serializer(opts, self.types)
 
+        # Archive paths deserialized since the last reset, see State.track_dependencies
+        self.used_paths = set()
+
+        self._manifest = None
+        self._character_names = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = self.deserialize_from_path("TemplateManifest.xml")
+        return self._manifest
+
+    @property
+    def character_names(self):
+        if self._character_names is None:
+            self._character_names = self.deserialize_from_path("CharacterNames.xml")
+        return self._character_names
+
     def deserialize(self, data):
         return self.ser.deserialize(data)
     
     def deserialize_from_path(self, path: str):
+        self.used_paths.add(path)
         try:
             to_return = self.archive.deserialize(path, self.ser)
         except:
@@ -0,0 +1,126 @@
+from pathlib import Path
+import sqlite3
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ("parquet", "arrow")
+BATCH_SIZE = 65536
+
+# Exported next to the tables, with lang ids resolved to English text
+VIEW_QUERIES = {
+    "items_named": """SELECT items.*, name.data AS name_text FROM items
+LEFT JOIN locale_en name ON name.id = items.name""",
+    "item_stats_named": """SELECT item_stats.*, name.data AS item_name FROM item_stats
+LEFT JOIN items ON items.id = item_stats.item
+LEFT JOIN locale_en name ON name.id = items.name""",
+    "units_named": """SELECT units.*, name.data AS name_text, title.data AS title_text FROM units
+LEFT JOIN locale_en name ON name.id = units.name
+LEFT JOIN locale_en title ON title.id = units.title""",
+    "unit_stats_named": """SELECT unit_stats.*, name.data AS unit_name FROM unit_stats
+LEFT JOIN units ON units.id = unit_stats.unit
+LEFT JOIN locale_en name ON name.id = units.name""",
+    "pets_named": """SELECT pets.*, name.data AS name_text FROM pets
+LEFT JOIN locale_en name ON name.id = pets.name""",
+    "powers_named": """SELECT powers.*, name.data AS name_text, description.data AS description_text FROM powers
+LEFT JOIN locale_en name ON name.id = powers.name
+LEFT JOIN locale_en description ON description.id = powers.description""",
+    "talents_named": """SELECT talents.*, name.data AS name_text FROM talents
+LEFT JOIN locale_en name ON name.id = talents.name""",
+    "talent_ranks_named": """SELECT talent_ranks.*, name.data AS talent_name, description.data AS description_text FROM talent_ranks
+LEFT JOIN talents ON talents.id = talent_ranks.talent
+LEFT JOIN locale_en name ON name.id = talents.name
+LEFT JOIN locale_en description ON description.id = talent_ranks.description""",
+}
+
+
+def _tables(db: sqlite3.Connection) -> list:
+    return [
+        name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+        if name != "search" and not name.startswith("search_") and not name.startswith("sqlite_")
+    ]
+
+def _column_types(db: sqlite3.Connection, query: str, columns: list) -> list:
+    """Picks an Arrow type per column from the SQLite storage classes in it."""
+    if len(columns) == 0:
+        return []
+    # One pass over the table for every column at once
+    storage = ", ".join(f"group_concat(DISTINCT typeof(\"{column}\"))" for column in columns)
+    row = db.execute(f"SELECT {storage} FROM ({query})").fetchone()
+
+    types = []
+    for classes in row:
+        classes = set((classes or "null").split(",")) - {"null"}
+        if "text" in classes:
+            types.append(pyarrow.string())
+        elif "blob" in classes:
+            types.append(pyarrow.binary())
+        elif "real" in classes:
+            types.append(pyarrow.float64())
+        elif "integer" in classes:
+            types.append(pyarrow.int64())
+        else:
+            types.append(pyarrow.null())
+    return types
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+def _convert(values, arrow_type):
+    # Columns that mix text with numbers or bytes are exported as text
+    if arrow_type == pyarrow.string():
+        return [_text(value) for value in values]
+    return list(values)
+
+def export_query(db: sqlite3.Connection, query: str, out: Path, format: str = "parquet", batch_size: int = BATCH_SIZE) -> int:
+    cursor = db.execute(query)
+    columns = [description[0] for description in cursor.description]
+    types = _column_types(db, query, columns)
+    schema = pyarrow.schema(list(zip(columns, types)))
+
+    if format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(str(out), schema)
+    else:
+        writer = pyarrow.ipc.new_file(str(out), schema)
+
+    count = 0
+    with writer:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if len(rows) == 0:
+                break
+            arrays = [
+                pyarrow.array(_convert(values, arrow_type), type=arrow_type)
+                for values, arrow_type in zip(zip(*rows), types)
+            ]
+            writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+def export_db(database: Path, out_dir: Path, format: str = "parquet", batch_size: int = BATCH_SIZE):
+    """Writes every table and the VIEW_QUERIES of database to out_dir."""
+    if pyarrow is None:
+        raise RuntimeError("exporting needs pyarrow, install it with pip install pyarrow")
+    if not database.is_file():
+        raise RuntimeError(f"{database} doesn't exist, build it first")
+
+    suffix = ".parquet" if format == "parquet" else ".arrow"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    db = sqlite3.connect(f"{database.absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        queries = {table: f"SELECT * FROM {table}" for table in _tables(db)}
+        queries.update(VIEW_QUERIES)
+        for name, query in queries.items():
+            count = export_query(db, query, out_dir / f"{name}{suffix}", format, batch_size)
+            print(f"Exported {count} rows of {name}")
+    finally:
+        db.close()
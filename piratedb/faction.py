@@ -3,11 +3,12 @@ from katsuba.utils import djb2 # type: ignore
 
 from .state import State
 from .lang_files import LangCache, LangKey, OtherLangKey
-from .tid_find import find_tid_path
-from .utils import STATS, MANIFEST, CHARACTER_NAMES
+from .utils import STATS
+
+FACTION_TEMPLATE = djb2("class FactionTemplate")
 
 def is_faction_template(obj: dict) -> bool:
-    return (obj.type_hash == djb2("class FactionTemplate"))
+    return (obj.type_hash == FACTION_TEMPLATE)
 
 class Faction:
     def __init__(self, state: State, obj: dict):
@@ -29,7 +30,7 @@ class Faction:
             self.no_names = True
 
         self.unit_names = {"FirstNames": [], "LastNames": [], "Articles": []}
-        name_table = CHARACTER_NAMES["m_table"]["m_serialValues"]
+        name_table = state.name_table
         if self.unit_first_names_check:
             key_search_1 = f"{self.faction_key.decode("utf-8")}_Unit_FirstNames"
             key_search_2 = key_search_1
@@ -38,43 +39,30 @@ class Faction:
                 key_search_2 += "_Female"
             key_search_1 = key_search_1.encode("utf-8")
             key_search_2 = key_search_2.encode("utf-8")
-            name_count = 0
-            for name_list in name_table:
-                if name_list["first"] == key_search_1 or name_list["first"] == key_search_2:
-                    second = name_list["second"]
-                    lang_section = second["m_langSection"]
-                    for name in second["m_names"]:
-                        self.unit_names["FirstNames"].append([state.make_other_lang_key((lang_section + b"_" + name))])
-                        if key_search_1 != key_search_2:
-                            if name_list["first"] == key_search_1:
-                                self.unit_names["FirstNames"][-1].append("Male")
-                            elif name_list["first"] == key_search_2:
-                                self.unit_names["FirstNames"][-1].append("Female")
-                        else:
-                            self.unit_names["FirstNames"][-1].append("Neutral")
-                    name_count += 1
-                    if name_count >= 2 or (name_count >= 1 and key_search_1 == key_search_2):
-                        break
+            if key_search_1 != key_search_2:
+                # The first two lists of either gender, in table order
+                name_lists = name_table.find(key_search_1, key_search_2)[:2]
+            else:
+                name_lists = name_table.find(key_search_1)[:1]
+            for position, first, second in name_lists:
+                if key_search_1 == key_search_2:
+                    gender = "Neutral"
+                elif first == key_search_1:
+                    gender = "Male"
+                else:
+                    gender = "Female"
+                for lang_key in name_table.lang_keys(position, second):
+                    self.unit_names["FirstNames"].append([lang_key, gender])
         
         if self.unit_last_names_check:
             key_search = f"{self.faction_key.decode("utf-8")}_Unit_LastNames".encode("utf-8")
-            for name_list in name_table:
-                if name_list["first"] == key_search:
-                    second = name_list["second"]
-                    lang_section = second["m_langSection"]
-                    for name in second["m_names"]:
-                        self.unit_names["LastNames"].append(state.make_other_lang_key((lang_section + b"_" + name)))
-                    break
+            for position, _, second in name_table.find(key_search)[:1]:
+                self.unit_names["LastNames"].extend(name_table.lang_keys(position, second))
 
         if self.unit_articles_check:
             key_search = f"{self.faction_key.decode("utf-8")}_Unit_Articles".encode("utf-8")
-            for name_list in name_table:
-                if name_list["first"] == key_search:
-                    second = name_list["second"]
-                    lang_section = second["m_langSection"]
-                    for name in second["m_names"]:
-                        self.unit_names["Articles"].append(state.make_other_lang_key((lang_section + b"_" + name)))
-                    break
+            for position, _, second in name_table.find(key_search)[:1]:
+                self.unit_names["Articles"].extend(name_table.lang_keys(position, second))
         
         if not self.unit_names["FirstNames"] and not self.unit_names["LastNames"] and not self.unit_names["Articles"]:
             self.no_names = True
\ No newline at end of file
@@ -1,8 +1,7 @@
 from katsuba.op import LazyObject # type: ignore
 
 from .state import State
-from .tid_find import find_school_tid
-from .utils import STATS, MANIFEST
+from .utils import STATS, get_behavior_names
 
 ITEM_TYPE_ADJECTIVES = [
     b"EQUIP_Weapon",
@@ -23,25 +22,22 @@ WEAPON_TYPE_ADJECTIVES = [
     b"TALENT_STAFF"
 ]
 
-def is_item_template(obj: dict) -> bool:
+def is_item_template(obj: dict, behaviors: set = None) -> bool:
     try:
         name = obj["m_displayName"]
         adjectives = obj["m_adjectiveList"]
-        behaviors = obj["m_behaviors"]
     except KeyError:
         return False
-    
-    is_item = False
-    for behavior in behaviors:
-        if behavior == None:
-            continue
-
-        if behavior["m_behaviorName"] == b"ItemBehavior":
-            for adjective in adjectives:
-                if adjective in ITEM_TYPE_ADJECTIVES:
-                    is_item = True
-            break
-    return is_item
+
+    if behaviors is None:
+        behaviors = get_behavior_names(obj)
+
+    if b"ItemBehavior" not in behaviors:
+        return False
+    for adjective in adjectives:
+        if adjective in ITEM_TYPE_ADJECTIVES:
+            return True
+    return False
 
 def _is_school_req(req: LazyObject) -> bool:
     try:
@@ -184,7 +180,7 @@ class Item:
                 if "m_requirements" in equipReqs:
                     for req in equipReqs["m_requirements"]:
                         if _is_school_req(req):
-                            self.school_req = find_school_tid(MANIFEST, req["m_classTemplateId"])
+                            self.school_req = state.tids.school(req["m_classTemplateId"])
                         elif _is_level_req(req):
                             self.level_req = req["m_nMinLevel"]
                         elif _is_talent_req(req):
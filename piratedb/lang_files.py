@@ -1,35 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import codecs
+import multiprocessing
 import os
 
-from .utils import fnv_1a
+from .utils import fnv_1a, fnv_1a_state
 from .deserializer import BinDeserializer
+from .locale_cache import LocaleStore, lang_file_digest
 
 
-# https://github.com/StarrFox/wizwalker/blob/master/wizwalker/file_readers/cache_handler.py#L114
-def _parse_lang_file(file_data: bytes) -> dict:
+def _line_end(file_data: bytes, newline: bytes, pos: int) -> int:
+    end = file_data.find(newline, pos)
+    # Only code unit aligned matches are real line breaks
+    while end % 2 and end != -1:
+        end = file_data.find(newline, end + 1)
+    return end
+
+# Format from https://github.com/StarrFox/wizwalker/blob/master/wizwalker/file_readers/cache_handler.py#L114
+def iter_lang_entries(file_data: bytes):
+    """Yields (key hash, text) for every entry of a UTF-16 .lang file.
+
+    Walks the raw buffer line by line: a "...:Section" header followed by
+    (id, comment, text) triples. Keys are hashed from the precomputed
+    "Section_" prefix state without building the key strings. <BR> markup
+    is dropped and repeated texts share one str object.
+    """
+    if len(file_data) % 2:
+        # empty file
+        return
+
+    if file_data.startswith(b"\xfe\xff"):
+        encoding, start = "utf-16-be", 2
+    elif file_data.startswith(b"\xff\xfe"):
+        encoding, start = "utf-16-le", 2
+    else:
+        encoding, start = "utf-16-le", 0
+
+    # The raw codec functions skip the per-call codec lookup of bytes.decode
+    decode = codecs.utf_16_be_decode if encoding == "utf-16-be" else codecs.utf_16_le_decode
+    newline = "\r\n".encode(encoding)
+    size = len(file_data)
+    find = file_data.find
+
+    end = _line_end(file_data, newline, start)
+    header = decode(file_data[start:size if end == -1 else end], None, True)[0]
+    _, lang_name = header.split(":")
+    prefix_state = fnv_1a_state(f"{lang_name}_".encode())
+    texts = {}
+    intern = texts.setdefault
+
+    while end != -1:
+        id_start = end + 4
+        id_end = find(newline, id_start)
+        if id_end % 2:
+            id_end = _line_end(file_data, newline, id_end)
+            if id_end == -1:
+                return
+        comment_end = find(newline, id_end + 4)
+        if comment_end % 2:
+            comment_end = _line_end(file_data, newline, comment_end)
+            if comment_end == -1:
+                return
+        end = find(newline, comment_end + 4)
+        if end % 2:
+            end = _line_end(file_data, newline, end)
+
+        locale_id = decode(file_data[id_start:id_end], None, True)[0].encode()
+        text = decode(file_data[comment_end + 4:size if end == -1 else end], None, True)[0]
+        if "<BR>" in text:
+            text = text.replace("<BR>", "")
+        yield fnv_1a_state(locale_id, prefix_state) >> 1, intern(text, text)
+
+def _hash_lang_file(file_data: bytes) -> dict:
     try:
-        decoded = file_data.decode("utf-16")
+        return dict(iter_lang_entries(file_data))
     except UnicodeDecodeError:
-        # empty file
+        # Malformed files contribute nothing rather than failing the build
         return {}
 
-    file_lines = decoded.split("\r\n")
+# Locale/<name> directory -> locale_<code> table suffix
+LOCALE_CODES = {
+    "English": "en",
+    "German": "de",
+    "French": "fr",
+    "Spanish": "es",
+    "Italian": "it",
+    "Portuguese": "pt",
+    "Polish": "pl",
+    "Russian": "ru",
+    "Chinese": "zh",
+    "Japanese": "ja",
+    "Korean": "ko",
+}
 
-    header, *lines = file_lines
-    _, lang_name = header.split(":")
+def locale_code(name: str) -> str:
+    return LOCALE_CODES.get(name, name.lower())
+
+def lang_ref(text: str) -> bytes:
+    """Returns the key a "...&Section_Key&..." text defers to, if any."""
+    parts = text.split("&")
+    if len(parts) > 2:
+        return parts[1].encode("utf-8")
+    return None
 
-    lang_mapping = {}
-    for locale_id, locale_string in zip(lines[::3], lines[2::3]):
-        lang_mapping[f"{lang_name}_{locale_id}"] = locale_string
+def load_locales(primary: "LangCache", caches: list, workers: int = None):
+    """Loads every .lang file primary has loaded into each of caches.
 
-    return lang_mapping
+    All locales share one process pool, so their files parse concurrently.
+    """
+    files = sorted(path.rsplit("/", 1)[-1] for path in primary.loaded_files)
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        pending = []
+        for cache in caches:
+            available = set(cache.de.archive.iter_glob(f"{cache.locale}/*.lang"))
+            paths = [f"{cache.locale}/{file}" for file in files if f"{cache.locale}/{file}" in available]
+            pending.append((cache, cache._submit(paths, pool)))
+
+        for cache, jobs in pending:
+            cache._collect(jobs)
 
 
 class LangCache:
-    def __init__(self, de: BinDeserializer, locale_dir: Path):
+    def __init__(self, de: BinDeserializer, locale_dir: Path, store: LocaleStore = None):
         self.locale = locale_dir
         self.lookup = {}
         self.de = de
+        self.store = store
+        # .lang files consulted since the last reset, see State.track_dependencies
+        self.used_files = set()
+        # .lang files already parsed into lookup
+        self.loaded_files = set()
+        # Key hashes confirmed absent after their .lang file was loaded
+        self.missing = set()
         #for file in os.listdir(self.locale):
             #self.add_file((self.locale / file).with_suffix(".lang"))
 
@@ -42,34 +146,82 @@ class LangCache:
         key_hash = fnv_1a(key)
         lookup_get = self.lookup.get(key_hash)
 
+        file, _ = key.decode().split("_", 1)
+        self.used_files.add(f"{self.locale}/{file}.lang")
         if lookup_get is None:
-            file, _ = key.decode().split("_", 1)
-            self.add_file(f"{self.locale}/{file}.lang")
+            if key_hash in self.missing:
+                return None
+            self.load_file(f"{self.locale}/{file}.lang")
 
-        try:
-            lang_ref = lookup_get.split("&")[2]
-        except:
-            pass
-        else:
-            lang_ref = lookup_get.split("&")[1].encode("utf-8")
-            lang_ref_hash = fnv_1a(lang_ref)
+        ref = lang_ref(lookup_get) if lookup_get is not None else None
+        if ref is not None:
+            lang_ref_hash = fnv_1a(ref)
+            file, _ = ref.decode().split("_", 1)
+            self.used_files.add(f"{self.locale}/{file}.lang")
             if self.lookup.get(lang_ref_hash) is None:
-                file, _ = lang_ref.decode().split("_", 1)
-                self.add_file(f"{self.locale}/{file}.lang")
+                self.load_file(f"{self.locale}/{file}.lang")
 
-        key_hash = fnv_1a(key)
-        lookup_get = self.lookup.get(key_hash)
-        if lookup_get is not None:
+        if key_hash in self.lookup:
             return key_hash
         else:
+            self.missing.add(key_hash)
             return None
 
+    def preload(self, workers: int = None):
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            self._collect(self._submit(self.de.archive.iter_glob(f"{self.locale}/*.lang"), pool))
+
+    def _submit(self, paths, pool: ProcessPoolExecutor) -> list:
+        jobs = []
+        for path in paths:
+            if path in self.loaded_files:
+                continue
+
+            data = self.de.archive[path]
+            digest = None
+            if self.store is not None:
+                digest = lang_file_digest(data)
+                # Files with a compiled table don't need a worker
+                if self._load_compiled(path, digest):
+                    continue
+            jobs.append((path, digest, pool.submit(_hash_lang_file, data)))
+        return jobs
+
+    def _collect(self, jobs: list):
+        for path, digest, future in jobs:
+            mapping = future.result()
+            self.lookup.update(mapping)
+            self.loaded_files.add(path)
+            if self.store is not None:
+                self.store.save(digest, mapping)
+
+    def _load_compiled(self, path: str, digest: str) -> bool:
+        mapping = self.store.load(digest)
+        if mapping is None:
+            return False
+
+        self.lookup.update(mapping)
+        self.loaded_files.add(path)
+        return True
+
+    def load_file(self, path: str):
+        if path not in self.loaded_files:
+            self.add_file(path)
+
     def add_file(self, path: str):
         data = self.de.archive[path]
-        mapping = _parse_lang_file(data)
+        if self.store is None:
+            self.loaded_files.add(path)
+            self.lookup.update(_hash_lang_file(data))
+            return
 
-        for key, name in mapping.items():
-            self.add_entry(key, name)
+        digest = lang_file_digest(data)
+        if not self._load_compiled(path, digest):
+            mapping = _hash_lang_file(data)
+            self.store.save(digest, mapping)
+            self.lookup.update(mapping)
+            self.loaded_files.add(path)
 
 
 class LangKey:
@@ -0,0 +1,90 @@
+from array import array
+from pathlib import Path
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+LOCALE_CACHE_VERSION = 2
+
+# magic, version, entry count
+_HEADER = struct.Struct("<4sII")
+_MAGIC = b"PDBL"
+
+
+def lang_file_digest(file_data: bytes) -> str:
+    return hashlib.blake2b(file_data, digest_size=16).hexdigest()
+
+
+class LocaleStore:
+    """Compiled hash -> text tables of .lang files, keyed by file content.
+
+    Each table is one file: a header, the little-endian u64 key hashes and
+    the NUL separated UTF-8 texts in the same order.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # Digests loaded or saved by this build, everything else is stale
+        self.used = set()
+
+    def _file(self, digest: str) -> Path:
+        return self.path / f"{digest}.bin"
+
+    def load(self, digest: str) -> dict:
+        try:
+            with open(self._file(digest), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    magic, version, count = _HEADER.unpack_from(view, 0)
+                    if magic != _MAGIC or version != LOCALE_CACHE_VERSION:
+                        return None
+                    # Marked before the empty and truncated table checks, a truncated one is saved again
+                    self.used.add(digest)
+
+                    table_end = _HEADER.size + count * 8
+                    hashes = array("Q", view[_HEADER.size:table_end])
+                    texts = str(view[table_end:], "utf-8").split("\0")
+        except (OSError, ValueError, struct.error):
+            return None
+
+        if count == 0:
+            return {}
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        if len(texts) != count:
+            return None
+        return dict(zip(hashes, texts))
+
+    def save(self, digest: str, lookup: dict):
+        self.used.add(digest)
+        texts = list(lookup.values())
+        if any("\0" in text for text in texts):
+            # Can't be represented, parse this file every time instead
+            return
+
+        hashes = array("Q", lookup.keys())
+        if sys.byteorder == "big":
+            hashes.byteswap()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = self._file(digest)
+        tmp = file.with_name(f"{file.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, LOCALE_CACHE_VERSION, len(texts)))
+            f.write(hashes.tobytes())
+            f.write("\0".join(texts).encode("utf-8"))
+        os.replace(tmp, file)
+
+    def prune(self) -> int:
+        """Removes tables of .lang files this build didn't load.
+
+        Tables written by an older LOCALE_CACHE_VERSION are never loaded,
+        so they go too once their file has been compiled again.
+        """
+        removed = 0
+        for file in self.path.glob("*.bin"):
+            if file.stem not in self.used:
+                file.unlink()
+                removed += 1
+        return removed
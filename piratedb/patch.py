@@ -0,0 +1,191 @@
+from pathlib import Path
+import os
+import sqlite3
+
+PATCH_VERSION = 1
+
+# Child tables whose ids are just row numbers. They shift whenever a row is
+# added before them, so these are diffed by content instead of by id.
+SURROGATE_KEY_TABLES = (
+    "random_names",
+    "curve_points",
+    "curve_abilities",
+    "item_stats",
+    "power_adjustments",
+    "power_info",
+    "talent_ranks",
+    "talent_stats",
+    "unit_talents",
+    "unit_stats",
+    "unit_tags",
+    "indiv_pet_talents",
+    "indiv_pet_powers",
+)
+
+# Rebuilt or rewritten on apply rather than diffed
+SKIPPED_TABLES = ("build_info", "search", "sqlite_stat1")
+
+
+class PatchError(Exception):
+    pass
+
+
+def build_id(db: sqlite3.Connection, schema: str = "main") -> str:
+    try:
+        row = db.execute(f"SELECT build_id FROM {schema}.build_info").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row != None else None
+
+def _tables(db: sqlite3.Connection, schema: str) -> dict:
+    tables = {}
+    for name, sql in db.execute(f"SELECT name, sql FROM {schema}.sqlite_master WHERE type = 'table'"):
+        if name in SKIPPED_TABLES or name.startswith("search_") or name.startswith("sqlite_"):
+            continue
+        tables[name] = sql
+    return tables
+
+def _columns(db: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+
+def _content_counts(db: sqlite3.Connection, schema: str, table: str, columns: list) -> dict:
+    names = ", ".join(columns)
+    return {row[:-1]: row[-1] for row in db.execute(f"SELECT {names}, count(*) FROM {schema}.{table} GROUP BY {names}")}
+
+
+def write_patch(old: Path, new: Path, out: Path):
+    """Writes the changes that turn database old into new as an SQLite file.
+
+    For every table T the patch has upsert_T and delete_T. Tables keyed by
+    template or lang id list replaced rows and deleted ids. Surrogate key
+    tables list row contents (without id) with how many copies to add or
+    remove. meta records which build the patch applies to.
+    """
+    db = sqlite3.connect(str(new))
+    db.execute("ATTACH DATABASE ? AS old", (str(old),))
+
+    tables = _tables(db, "main")
+    if tables != _tables(db, "old"):
+        db.close()
+        raise PatchError("schema changed between builds, a full download is required")
+    from_build, to_build = build_id(db, "old"), build_id(db, "main")
+    if from_build == None or to_build == None:
+        db.close()
+        raise PatchError(f"{old if from_build == None else new} has no build id, a full download is required")
+
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        changes = _write_changes(db, tables, tmp, from_build, to_build)
+    except:
+        db.close()
+        if tmp.exists():
+            tmp.unlink()
+        raise
+    db.close()
+    os.replace(tmp, out)
+    return changes
+
+def _write_changes(db: sqlite3.Connection, tables: dict, tmp: Path, from_build: str, to_build: str) -> int:
+    db.execute("ATTACH DATABASE ? AS patch", (str(tmp),))
+
+    db.execute("CREATE TABLE patch.meta (key text not null primary key, value text)")
+    db.executemany("INSERT INTO patch.meta(key, value) VALUES (?, ?)", [
+        ("version", str(PATCH_VERSION)),
+        ("from_build", from_build),
+        ("to_build", to_build),
+        ("built_at", db.execute("SELECT built_at FROM main.build_info").fetchone()[0]),
+    ])
+
+    changes = 0
+    for table in sorted(tables):
+        if table in SURROGATE_KEY_TABLES:
+            columns = [column for column in _columns(db, table) if column != "id"]
+            names = ", ".join(columns)
+            db.execute(f"CREATE TABLE patch.upsert_{table} AS SELECT {names}, 0 AS copies FROM main.{table} WHERE 0")
+            db.execute(f"CREATE TABLE patch.delete_{table} AS SELECT {names}, 0 AS copies FROM main.{table} WHERE 0")
+
+            old_counts = _content_counts(db, "old", table, columns)
+            new_counts = _content_counts(db, "main", table, columns)
+            added = [(*row, count - old_counts.get(row, 0)) for row, count in new_counts.items() if count > old_counts.get(row, 0)]
+            removed = [(*row, count - new_counts.get(row, 0)) for row, count in old_counts.items() if count > new_counts.get(row, 0)]
+
+            placeholders = ", ".join("?" * (len(columns) + 1))
+            db.executemany(f"INSERT INTO patch.upsert_{table} VALUES ({placeholders})", added)
+            db.executemany(f"INSERT INTO patch.delete_{table} VALUES ({placeholders})", removed)
+            changes += len(added) + len(removed)
+        else:
+            db.execute(f"CREATE TABLE patch.upsert_{table} AS SELECT * FROM main.{table} EXCEPT SELECT * FROM old.{table}")
+            db.execute(f"CREATE TABLE patch.delete_{table} AS SELECT id FROM old.{table} EXCEPT SELECT id FROM main.{table}")
+            changes += db.execute(f"SELECT (SELECT count(*) FROM patch.upsert_{table}) + (SELECT count(*) FROM patch.delete_{table})").fetchone()[0]
+
+    db.commit()
+    db.execute("DETACH DATABASE patch")
+    return changes
+
+
+def apply_patch(patch: Path, target: Path):
+    """Applies a patch from write_patch to target in a single transaction."""
+    # db writes patches while building, so import it late
+    from .db import create_search
+
+    if not patch.exists():
+        raise PatchError(f"{patch} doesn't exist")
+    db = sqlite3.connect(str(target))
+    try:
+        db.execute("ATTACH DATABASE ? AS patch", (str(patch),))
+        meta = dict(db.execute("SELECT key, value FROM patch.meta"))
+    except sqlite3.Error:
+        db.close()
+        raise PatchError(f"{patch} isn't a patch")
+
+    if meta.get("version") != str(PATCH_VERSION):
+        db.close()
+        raise PatchError(f"unsupported patch version {meta.get('version')}")
+    current = build_id(db)
+    if current == None or meta.get("from_build") == None or meta.get("to_build") == None:
+        db.close()
+        raise PatchError(f"{target if current == None else patch} has no build id")
+    if current != meta["from_build"]:
+        db.close()
+        raise PatchError(f"patch is for build {meta['from_build']}, database is build {current}")
+
+    tables = _tables(db, "main")
+    try:
+        for table in sorted(tables):
+            columns = _columns(db, table)
+            if table in SURROGATE_KEY_TABLES:
+                columns.remove("id")
+                names = ", ".join(columns)
+                matches = " AND ".join(f"{column} IS ?" for column in columns)
+                removed = db.execute(f"SELECT * FROM patch.delete_{table}").fetchall()
+                for *row, copies in removed:
+                    db.execute(f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {matches} LIMIT ?)", (*row, copies))
+
+                placeholders = ", ".join("?" * len(columns))
+                added = db.execute(f"SELECT * FROM patch.upsert_{table}").fetchall()
+                db.executemany(
+                    f"INSERT INTO {table}({names}) VALUES ({placeholders})",
+                    [tuple(row) for *row, copies in added for _ in range(copies)]
+                )
+            else:
+                db.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM patch.delete_{table})")
+                names = ", ".join(columns)
+                db.execute(f"INSERT OR REPLACE INTO {table}({names}) SELECT {names} FROM patch.upsert_{table}")
+
+        db.execute("UPDATE build_info SET build_id = ?, built_at = ?", (meta["to_build"], meta["built_at"]))
+        db.commit()
+    except:
+        db.rollback()
+        db.close()
+        raise
+
+    db.execute("DETACH DATABASE patch")
+    cursor = db.cursor()
+    if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'search'").fetchone() != None:
+        cursor.execute("DROP TABLE search")
+        create_search(cursor)
+    cursor.execute("ANALYZE")
+    db.commit()
+    db.close()
@@ -1,25 +1,20 @@
 from .state import State
+from .utils import get_behavior_names
 
-def is_pet_template(obj: dict) -> bool:
+def is_pet_template(obj: dict, behaviors: set = None) -> bool:
     try:
         name = obj["m_displayName"]
         adj_list = obj["m_adjectiveList"]
-        behaviors = obj["m_behaviors"]
     except KeyError:
         return False
     
     if b"EQUIP_Pet" not in adj_list:
         return False
-    is_pet = False
-    for behavior in behaviors:
-        if behavior == None:
-            continue
 
-        if behavior["m_behaviorName"] == b"AdvancedPetBehavior":
-            is_pet = True
-            break
-    
-    return is_pet
+    if behaviors is None:
+        behaviors = get_behavior_names(obj)
+
+    return b"AdvancedPetBehavior" in behaviors
 
 class Pet:
     def __init__(self, state: State, obj: dict):
@@ -0,0 +1,3 @@
+from .database import Database
+from .models import Item, ItemStat, Unit, Power, Talent, TalentRank
+from .pool import ConnectionPool
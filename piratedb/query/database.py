@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from pathlib import Path
+import os
+import sqlite3
+import threading
+
+from .models import Item, ItemStat, Unit, Power, Talent, TalentRank
+from .pool import ConnectionPool
+
+ITEM_QUERY = """SELECT items.id, name.data, items.real_name, items.image, items.item_type, items.item_flags,
+    items.equip_school, items.equip_level, items.equip_talent, items.equip_talent_rank
+FROM items
+LEFT JOIN locale_en name ON name.id = items.name"""
+
+ITEM_STATS_QUERY = "SELECT type, stat, amount FROM item_stats WHERE item = ? ORDER BY id"
+
+UNIT_QUERY = """SELECT units.id, name.data, units.real_name, units.image, title.data, units.gender, units.faction,
+    units.school, units.dmg_type, units.primary_stat, units.curve, units.kind
+FROM units
+LEFT JOIN locale_en name ON name.id = units.name
+LEFT JOIN locale_en title ON title.id = units.title"""
+
+POWER_QUERY = """SELECT powers.id, name.data, powers.real_name, powers.image, description.data,
+    powers.pvp_tag, powers.target_type, powers.target_style
+FROM powers
+LEFT JOIN locale_en name ON name.id = powers.name
+LEFT JOIN locale_en description ON description.id = powers.description"""
+
+TALENT_QUERY = """SELECT talents.id, name.data, talents.real_name, talents.image
+FROM talents
+LEFT JOIN locale_en name ON name.id = talents.name"""
+
+TALENT_RANKS_QUERY = """SELECT ranks.rank, description.data, ranks.level_req_unit, stats.operator, stats.stat, stats.amount
+FROM talent_ranks ranks
+LEFT JOIN locale_en description ON description.id = ranks.description
+LEFT JOIN talent_stats stats ON stats.talent = ranks.talent AND stats.rank = ranks.rank
+WHERE ranks.talent = ?
+ORDER BY ranks.id"""
+
+
+class Database:
+    """Typed, cached lookups against a built items.db.
+
+    Results are immutable and cached by call until the database's build_id
+    changes, which is checked whenever the file on disk changes.
+    """
+
+    def __init__(self, path: Path, pool_size: int = 4, cache_size: int = 1024):
+        self.path = Path(path)
+        self.pool = ConnectionPool(self.path, pool_size)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.file_version = self._file_version()
+        self.build_id = self._read_build_id()
+
+    def _file_version(self) -> tuple:
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read_build_id(self) -> str:
+        with self.pool.connection() as db:
+            try:
+                row = db.execute("SELECT build_id FROM build_info").fetchone()
+            except sqlite3.OperationalError:
+                return None
+        return row[0] if row != None else None
+
+    def refresh(self):
+        """Picks up a rebuilt or patched database, dropping stale results."""
+        version = self._file_version()
+        if version == self.file_version:
+            return
+
+        self.pool.reset()
+        build_id = self._read_build_id()
+        with self.lock:
+            self.file_version = version
+            if build_id != self.build_id:
+                self.build_id = build_id
+                self.cache.clear()
+
+    def _cached(self, key: tuple, load):
+        self.refresh()
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            build_id = self.build_id
+
+        with self.pool.connection() as db:
+            value = load(db)
+
+        with self.lock:
+            # Don't cache results that raced with a rebuild
+            if build_id == self.build_id:
+                self.cache[key] = value
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return value
+
+    def build_info(self) -> dict:
+        def load(db):
+            try:
+                row = db.execute("SELECT build_id, built_at FROM build_info").fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            if row == None:
+                return {"build_id": None, "built_at": None}
+            return {"build_id": row[0], "built_at": row[1]}
+        return self._cached(("build_info",), load)
+
+    def item(self, item_id: int) -> Item:
+        def load(db):
+            row = db.execute(f"{ITEM_QUERY} WHERE items.id = ?", (item_id,)).fetchone()
+            return _item(db, row) if row != None else None
+        return self._cached(("item", item_id), load)
+
+    def items_by_name(self, name: str) -> tuple:
+        def load(db):
+            rows = db.execute(f"{ITEM_QUERY} WHERE name.data = ? ORDER BY items.id", (name,)).fetchall()
+            return tuple(_item(db, row) for row in rows)
+        return self._cached(("items_by_name", name), load)
+
+    def units_by_faction(self, faction: int) -> tuple:
+        def load(db):
+            rows = db.execute(f"{UNIT_QUERY} WHERE units.faction = ? ORDER BY units.id", (faction,)).fetchall()
+            return tuple(Unit(*row) for row in rows)
+        return self._cached(("units_by_faction", faction), load)
+
+    def powers_by_target_style(self, target_style: str) -> tuple:
+        def load(db):
+            rows = db.execute(f"{POWER_QUERY} WHERE powers.target_style = ? ORDER BY powers.id", (target_style,)).fetchall()
+            return tuple(Power(*row) for row in rows)
+        return self._cached(("powers_by_target_style", target_style), load)
+
+    def talent(self, talent_id: int) -> Talent:
+        def load(db):
+            row = db.execute(f"{TALENT_QUERY} WHERE talents.id = ?", (talent_id,)).fetchone()
+            if row == None:
+                return None
+            ranks = tuple(TalentRank(*rank) for rank in db.execute(TALENT_RANKS_QUERY, (talent_id,)))
+            return Talent(*row, ranks)
+        return self._cached(("talent", talent_id), load)
+
+    def close(self):
+        self.pool.close()
+
+
+def _item(db: sqlite3.Connection, row: tuple) -> Item:
+    stats = tuple(ItemStat(*stat) for stat in db.execute(ITEM_STATS_QUERY, (row[0],)))
+    return Item(*row, stats)
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ItemStat:
+    type: str
+    stat: object
+    amount: object
+
+
+@dataclass(frozen=True)
+class Item:
+    id: int
+    name: str
+    real_name: bytes
+    image: bytes
+    item_type: str
+    item_flags: int
+    equip_school: str
+    equip_level: int
+    equip_talent: int
+    equip_talent_rank: int
+    stats: tuple
+
+
+@dataclass(frozen=True)
+class Unit:
+    id: int
+    name: str
+    real_name: bytes
+    image: bytes
+    title: str
+    gender: str
+    faction: int
+    school: str
+    dmg_type: str
+    primary_stat: object
+    curve: int
+    kind: str
+
+
+@dataclass(frozen=True)
+class Power:
+    id: int
+    name: str
+    real_name: bytes
+    image: bytes
+    description: str
+    pvp_tag: object
+    target_type: object
+    target_style: str
+
+
+@dataclass(frozen=True)
+class TalentRank:
+    rank: int
+    description: str
+    level_req_unit: int
+    operator: str
+    stat: str
+    amount: object
+
+
+@dataclass(frozen=True)
+class Talent:
+    id: int
+    name: str
+    real_name: bytes
+    image: bytes
+    ranks: tuple
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+from pathlib import Path
+import queue
+import sqlite3
+import threading
+
+# Prepared statements kept per connection, see sqlite3.connect
+CACHED_STATEMENTS = 256
+
+
+class ConnectionPool:
+    """A fixed number of read-only connections shared between threads."""
+
+    def __init__(self, path: Path, size: int = 4):
+        self.path = Path(path)
+        self.size = size
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put((self.generation, self._connect()))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(
+            f"{self.path.absolute().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        db.execute("PRAGMA query_only = ON")
+        return db
+
+    @contextmanager
+    def connection(self):
+        generation, db = self.idle.get()
+        if generation != self.generation:
+            # Opened before reset(), it still sees the replaced file
+            db.close()
+            generation, db = self.generation, self._connect()
+        try:
+            yield db
+        finally:
+            self.idle.put((generation, db))
+
+    def reset(self):
+        """Makes every connection reopen the file, e.g. after it was replaced."""
+        with self.lock:
+            self.generation += 1
+
+    def close(self):
+        for _ in range(self.size):
+            _, db = self.idle.get()
+            db.close()
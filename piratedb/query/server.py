@@ -0,0 +1,241 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from email.utils import format_datetime
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+import asyncio
+import json
+import re
+import threading
+
+from .database import Database
+
+MAX_HEADER_LINES = 100
+# Bodies up to this size are read and discarded to keep the connection usable
+MAX_DRAINED_BODY = 1 << 20
+RESPONSE_CACHE_SIZE = 4096
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"{type(value).__name__} isn't JSON serializable")
+
+def _to_json(value) -> bytes:
+    if isinstance(value, tuple):
+        value = [asdict(entry) for entry in value]
+    elif value != None and not isinstance(value, dict):
+        value = asdict(value)
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+def _int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise HttpError(400, f"expected an integer, got {value!r}")
+
+def _param(query: dict, name: str) -> str:
+    if name not in query:
+        raise HttpError(400, f"missing query parameter {name}")
+    return query[name][0]
+
+
+class QueryServer:
+    """JSON over HTTP for a Database, run on an asyncio event loop.
+
+    SQLite calls run on a bounded thread pool. Responses carry an ETag and
+    Last-Modified taken from build_info when it has them, and encoded
+    responses are cached until the build changes.
+    """
+
+    def __init__(self, db: Database, threads: int = 4):
+        self.db = db
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="piratedb-query")
+        self.responses = OrderedDict()
+        self.lock = threading.Lock()
+        self.build_id = None
+        self.routes = [
+            (re.compile(r"/build"), self.build),
+            (re.compile(r"/items/(\d+)"), lambda query, item_id: self.db.item(_int(item_id))),
+            (re.compile(r"/items"), lambda query: self.db.items_by_name(_param(query, "name"))),
+            (re.compile(r"/units"), lambda query: self.db.units_by_faction(_int(_param(query, "faction")))),
+            (re.compile(r"/powers"), lambda query: self.db.powers_by_target_style(_param(query, "target_style"))),
+            (re.compile(r"/talents/(\d+)"), lambda query, talent_id: self.db.talent(_int(talent_id))),
+        ]
+
+    def build(self, query: dict) -> dict:
+        return self.db.build_info()
+
+    def _render(self, target: str) -> tuple:
+        """Runs on the thread pool, returns ((status, body), build info)."""
+        info = self.db.build_info()
+        with self.lock:
+            if info["build_id"] != self.build_id:
+                self.responses.clear()
+                self.build_id = info["build_id"]
+
+            cached = self.responses.get(target)
+            if cached != None:
+                self.responses.move_to_end(target)
+                return cached, info
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        for pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path.rstrip("/") or "/")
+            if match == None:
+                continue
+
+            value = handler(query, *match.groups())
+            if value == None:
+                raise HttpError(404, "not found")
+            response = (200, _to_json(value))
+            with self.lock:
+                if info["build_id"] == self.build_id:
+                    self.responses[target] = response
+                    if len(self.responses) > RESPONSE_CACHE_SIZE:
+                        self.responses.popitem(last=False)
+            return response, info
+        raise HttpError(404, f"no route for {url.path}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    # The stream can't be trusted past a malformed request
+                    self._write_response(writer, e.status, _to_json({"error": str(e)}), {}, False, False)
+                    await writer.drain()
+                    break
+                if request == None:
+                    break
+                method, target, version, headers = request
+                keep_alive = self._keep_alive(version, headers)
+                if not await self._drain_body(reader, headers):
+                    keep_alive = False
+
+                extra = {}
+                try:
+                    if method not in ("GET", "HEAD"):
+                        raise HttpError(405, f"{method} not allowed")
+                    (status, body), info = await loop.run_in_executor(self.executor, self._render, target)
+
+                    if info["build_id"] != None:
+                        etag = f'"{info["build_id"]}"'
+                        extra["ETag"] = etag
+                        if headers.get("if-none-match") == etag:
+                            status, body = 304, b""
+                    if info["built_at"] != None:
+                        extra["Last-Modified"] = format_datetime(datetime.fromisoformat(info["built_at"]), usegmt=True)
+                except HttpError as e:
+                    status, body = e.status, _to_json({"error": str(e)})
+                except Exception as e:
+                    status, body = 500, _to_json({"error": repr(e)})
+
+                self._write_response(writer, status, body, extra, method == "HEAD", keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _keep_alive(self, version: str, headers: dict) -> bool:
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _drain_body(self, reader: asyncio.StreamReader, headers: dict) -> bool:
+        """Skips a request body, False if the connection has to be closed."""
+        if "transfer-encoding" in headers:
+            return False
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            return False
+        if length < 0 or length > MAX_DRAINED_BODY:
+            return False
+        if length > 0:
+            await reader.readexactly(length)
+        return True
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            line = await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HttpError(400, "request line too long")
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                raise HttpError(431, "header line too long")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(431, "too many header lines")
+        return method, target, version, headers
+
+    def _write_response(self, writer, status: int, body: bytes, extra: dict, head: bool, keep_alive: bool):
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Cache-Control: no-cache",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head:
+            writer.write(body)
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {self.db.path.absolute()} on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+        self.db.close()
+
+
+def serve(database: Path, host: str = "127.0.0.1", port: int = 8080, threads: int = 4):
+    server = QueryServer(Database(database, pool_size=threads), threads)
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from .state import State
+from .curve import Curve, CurveRegistry, is_curve_template
+from .faction import Faction, is_faction_template
+from .item import Item, is_item_template
+from .unit import Unit, is_unit_template
+from .pet import Pet, is_pet_template
+from .talent import Talent, is_talent_template
+from .power import Power, is_power_template
+from .pet_talents import PetTalent, is_pet_talent_template
+from .pet_powers import PetPower, is_pet_power_template
+from .utils import get_behavior_names
+
+# Template kind -> (predicate, constructor)
+TEMPLATE_KINDS = {
+    "curve": (is_curve_template, Curve),
+    "faction": (is_faction_template, Faction),
+    "item": (is_item_template, Item),
+    "unit": (is_unit_template, Unit),
+    "pet": (is_pet_template, Pet),
+    "pet_talent": (is_pet_talent_template, PetTalent),
+    "pet_power": (is_pet_power_template, PetPower),
+    "talent": (is_talent_template, Talent),
+    "power": (is_power_template, Power),
+}
+
+# Entity attributes nothing reads after the scan, left out of records
+UNUSED_FIELDS = {
+    "faction": (
+        "ship_gender_check",
+        "unit_articles_check",
+        "ship_articles_check",
+        "unit_first_names_check",
+        "ship_first_names_check",
+        "unit_last_names_check",
+        "ship_last_names_check",
+    ),
+    "pet": ("preferred_snacks",),
+}
+
+# Kinds whose predicate also takes the template's behavior names
+BEHAVIOR_KINDS = ("item", "unit", "pet", "power")
+
+# Archive glob -> template kinds that may live under it
+SCAN_GLOBS = {
+    "ObjectData/**/*.xml": ("curve", "item", "unit", "pet", "pet_talent", "pet_power"),
+    "Factions/**/*.xml": ("faction",),
+    "Talents/*.xml": ("talent",),
+    "Abilities/*.xml": ("power",),
+}
+
+
+class Record:
+    """The attributes of an extracted entity that the database is built from.
+
+    Records are what gets pickled by scan workers and the build cache, so
+    they don't drag along the entity classes or fields db.py never inserts.
+    """
+
+    def __init__(self, kind: str, entity):
+        unused = UNUSED_FIELDS.get(kind, ())
+        self.__dict__.update((name, value) for name, value in vars(entity).items() if name not in unused)
+
+
+def list_entries(state: State) -> list:
+    entries = []
+    for pattern, kinds in SCAN_GLOBS.items():
+        for path in state.de.archive.iter_glob(pattern):
+            entries.append((path, kinds))
+    return entries
+
+def classify(obj, kinds: tuple) -> list:
+    matched = []
+    behaviors = None
+    for kind in kinds:
+        predicate = TEMPLATE_KINDS[kind][0]
+        if kind in BEHAVIOR_KINDS:
+            # Collected once and shared by the predicates that read them
+            if behaviors is None:
+                behaviors = get_behavior_names(obj)
+            if predicate(obj, behaviors):
+                matched.append(kind)
+        elif predicate(obj):
+            matched.append(kind)
+    return matched
+
+def scan_entries(state: State, entries: list) -> list:
+    scanned = []
+    for path, kinds in entries:
+        state.track_dependencies()
+        obj = state.de.deserialize_from_path(path)
+
+        records = []
+        if obj != None:
+            for kind in classify(obj, kinds):
+                records.append((kind, Record(kind, TEMPLATE_KINDS[kind][1](state, obj))))
+        scanned.append((path, records, state.tracked_dependencies()))
+    return scanned
+
+def group_records(scanned: list) -> dict:
+    groups = {kind: [] for kind in TEMPLATE_KINDS}
+    for _, records, _ in scanned:
+        for kind, entity in records:
+            groups[kind].append(entity)
+    return groups
+
+def load_lang_dependencies(state: State, dependencies: set):
+    """Loads the primary locale's .lang files among dependencies."""
+    lang_files = [
+        dependency for dependency in dependencies
+        if isinstance(dependency, str) and dependency.startswith(f"{state.cache.locale}/")
+    ]
+    for lang_file in sorted(lang_files):
+        state.cache.load_file(lang_file)
+
+def resolve_units(units: list, curves: CurveRegistry):
+    for unit in units:
+        unit.school = curves.school(unit.curve)
+
+_worker_state = None
+
+def _scan_worker(root_wad, types, entries: list):
+    global _worker_state
+    if _worker_state is None:
+        _worker_state = State(root_wad, types)
+
+    return scan_entries(_worker_state, entries)
+
+def scan_entries_parallel(state: State, entries: list, jobs: int) -> list:
+    # Interleaved slices keep the per-worker load even across directories
+    slices = [entries[i::jobs] for i in range(jobs)]
+    order = {path: i for i, (path, _) in enumerate(entries)}
+
+    scanned = []
+    # Spawned workers open their own archive and serializer
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(jobs, mp_context=context) as pool:
+        futures = [pool.submit(_scan_worker, state.root_wad, state.types, part) for part in slices]
+        for future in futures:
+            scanned.extend(future.result())
+
+    # Workers compiled the .lang files they used into the locale store, so
+    # the strings are mapped from there rather than sent back with records
+    dependencies = set()
+    for _, _, deps in scanned:
+        dependencies.update(deps)
+    load_lang_dependencies(state, dependencies)
+
+    # Restore archive order so that everything downstream stays deterministic
+    scanned.sort(key=lambda entry: order[entry[0]])
+    return scanned
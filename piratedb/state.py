@@ -1,24 +1,72 @@
+from collections import OrderedDict
 from pathlib import Path
 
-from .lang_files import LangCache, LangKey, UnitLangKey, DescLangKey, RankTooltipLangKey, OtherLangKey
-from .deserializer import BinDeserializer
+from .lang_files import locale_code, LangCache, LangKey, UnitLangKey, DescLangKey, RankTooltipLangKey, OtherLangKey
+from .locale_cache import LocaleStore
+from .character_names import NameTable
+from .deserializer import get_deserializer
+from .tid_find import TidIndex
+
+# Templates referenced by other templates (effects, summoned props) are
+# shared by many abilities, so the most recent ones stay deserialized
+TEMPLATE_CACHE_SIZE = 4096
 
 class State:
-    def __init__(self, root_wad: Path, types: Path):
+    def __init__(self, root_wad: Path, types: Path, locale_cache: Path = None, locales: list = ("English",)):
         self.root_wad = root_wad
-        self.de = BinDeserializer(root_wad, types)
-        self.cache = LangCache(self.de, "Locale/English")
+        self.types = types
+        self.de = get_deserializer(root_wad, types)
+
+        # Compiled .lang tables live next to Root.wad unless told otherwise
+        if locale_cache is None:
+            locale_cache = Path(root_wad).parent / "locale_cache"
+        store = LocaleStore(locale_cache)
+        # Lang keys are resolved against the first locale, the others only mirror its files
+        self.locales = {locale_code(name): LangCache(self.de, f"Locale/{name}", store) for name in locales}
+        self.cache = next(iter(self.locales.values()))
+
+        self.tids = TidIndex(self.de.manifest)
+        self.file_to_id = self.tids.file_to_id
+        self.id_to_file = self.tids.id_to_file
+
+        self.templates = OrderedDict()
+        self.template_hits = 0
+        self.template_misses = 0
+        self._name_table = None
+
+    def track_dependencies(self):
+        self.de.used_paths = set()
+        self.cache.used_files = set()
+        self.tids.used = set()
+
+    def tracked_dependencies(self) -> set:
+        return self.de.used_paths | self.cache.used_files | {("tid", tid) for tid in self.tids.used}
+
+    @property
+    def name_table(self) -> NameTable:
+        if self._name_table is None:
+            self._name_table = NameTable(self.de.character_names, self.cache)
+        return self._name_table
 
-        self.file_to_id = {}
-        self.id_to_file = {}
+    def template(self, tid: int):
+        """Deserializes the template with ID tid, None if it doesn't exist."""
+        path = self.tids.path(tid)
+        if path is None:
+            return None
 
-        manifest = self.de.deserialize_from_path("TemplateManifest.xml")
-        for entry in manifest["m_serializedTemplates"]:
-            filename = entry["m_filename"].decode()
-            tid = entry["m_id"]
+        if path in self.templates:
+            self.template_hits += 1
+            self.templates.move_to_end(path)
+            # Still a dependency of whatever is being extracted right now
+            self.de.used_paths.add(path)
+            return self.templates[path]
 
-            self.file_to_id[filename] = tid
-            self.id_to_file[tid] = filename
+        self.template_misses += 1
+        obj = self.de.deserialize_from_path(path)
+        self.templates[path] = obj
+        if len(self.templates) > TEMPLATE_CACHE_SIZE:
+            self.templates.popitem(last=False)
+        return obj
 
     def make_lang_key(self, obj: dict) -> LangKey:
         return LangKey(self.cache, obj)
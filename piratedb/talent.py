@@ -3,6 +3,8 @@ from .unit import MODIFIER_OPERATORS
 from .utils import STATS
 from katsuba.utils import djb2 # type: ignore
 
+STAT_MODIFIER_INFO = djb2("class StatModifierInfo")
+
 def is_talent_template(obj: dict) -> bool:
     try:
         ranks = obj["m_ranks"]
@@ -60,7 +62,7 @@ class Talent:
             self.rank_tooltips.append(tuple(rank_tooltip_lst))
             effects = rank["m_effects"]
             for effect in effects:
-                if effect.type_hash == djb2("class StatModifierInfo"):
+                if effect.type_hash == STAT_MODIFIER_INFO:
                     try:
                         self.rank_operators.append(MODIFIER_OPERATORS[effect["m_eOperator"]])
                         self.rank_stats.append(STATS[effect["m_sStatName"]])
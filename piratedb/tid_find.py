@@ -1,33 +1,46 @@
-def find_tid_path(manifest: dict, tid: int) -> str:
-    filename = None
-    for entry in manifest["m_serializedTemplates"]:
-        if entry == None:
-            continue
-        if entry["m_id"] == tid:
-            filename = entry["m_filename"].decode()
-            break
-    return filename
+SCHOOL_SUFFIXES = {
+    "WIZ.xml": "Witchdoctor",
+    "age.xml": "Witchdoctor",
+    "THF.xml": "Swashbuckler",
+    "ief.xml": "Swashbuckler",
+    "RNG.xml": "Musketeer",
+    "ger.xml": "Musketeer",
+    "FTR.xml": "Buccaneer",
+    "ter.xml": "Buccaneer",
+    "CLR.xml": "Privateer",
+    "ric.xml": "Privateer",
+    "PET.xml": "Pet",
+}
+
+class TidIndex:
+    def __init__(self, manifest: dict):
+        self.file_to_id = {}
+        self.id_to_file = {}
+        self.schools = {}
+
+        # Template IDs looked up since the last reset, see State.track_dependencies
+        self.used = set()
 
-def find_school_tid(manifest: dict, tid: int) -> str:
-    filename = None
-    school = None
-    for entry in manifest["m_serializedTemplates"]:
-        if entry == None:
-            continue
-        if entry["m_id"] == tid:
+        for entry in manifest["m_serializedTemplates"]:
+            if entry == None:
+                continue
             filename = entry["m_filename"].decode()
-            break
-    filenameEnding = filename[-7:]
-    if filenameEnding == "WIZ.xml" or filenameEnding == "age.xml":
-        school = "Witchdoctor"
-    elif filenameEnding == "THF.xml" or filenameEnding == "ief.xml":
-        school = "Swashbuckler"
-    elif filenameEnding == "RNG.xml" or filenameEnding == "ger.xml":
-        school = "Musketeer"
-    elif filenameEnding == "FTR.xml" or filenameEnding == "ter.xml":
-        school = "Buccaneer"
-    elif filenameEnding == "CLR.xml" or filenameEnding == "ric.xml":
-        school = "Privateer"
-    elif filenameEnding == "PET.xml":
-        school = "Pet"
-    return school
\ No newline at end of file
+            tid = entry["m_id"]
+
+            self.file_to_id[filename] = tid
+            # Lookups always returned the first manifest entry for an ID
+            self.id_to_file.setdefault(tid, filename)
+
+    def path(self, tid: int) -> str:
+        self.used.add(tid)
+        return self.id_to_file.get(tid)
+
+    def school(self, tid: int) -> str:
+        self.used.add(tid)
+        if tid not in self.schools:
+            filename = self.id_to_file.get(tid)
+            if filename is None:
+                self.schools[tid] = None
+            else:
+                self.schools[tid] = SCHOOL_SUFFIXES.get(filename[-7:])
+        return self.schools[tid]
@@ -1,42 +1,31 @@
 from .state import State
-from .utils import STATS, MANIFEST, get_curve_class
-from .curve import Curve
+from .utils import STATS, get_behavior_names
 
 ATTACK_TYPES = {208075: "Melee", 208076: "Ranged", 732086: "Staff"}
 GENDERS = {0: "Female", 1: "Male", 2: "Neutral"}
 
-def is_unit_template(obj: dict) -> bool:
+def is_unit_template(obj: dict, behaviors: set = None) -> bool:
     try:
         suffix = obj["m_displayName"]
         image = obj["m_sIcon"][0]
         adj_list = obj["m_adjectiveList"]
-        behaviors = obj["m_behaviors"]
     except:
         return False
     
     if b"EQUIP_Pet" in adj_list:
         return False
-    
-    is_unit = False
-    for behavior in behaviors:
-        if behavior == None:
-            continue
-
-        if behavior["m_behaviorName"] == b"AdvancedPetBehavior":
-            is_unit = False
-            break
 
-        if behavior["m_behaviorName"] == b"UnitBehavior":
-            is_unit = True
+    if behaviors is None:
+        behaviors = get_behavior_names(obj)
 
-    return is_unit
+    return b"UnitBehavior" in behaviors and b"AdvancedPetBehavior" not in behaviors
 
 sources = {0: "Unknown", 1: "Template", 2: "Trained"}
 MODIFIER_OPERATORS = {0: "Set", 1: "Set Add", 2: "Multiply Add", 3: "Multiply", 4: "Add"}
 valid_flags = [b"WB_Beast", b"WB_Undead", b"WB_Fowl", b"ADJ_AmberHorde", b"ADJ_Armada", b"ADJ_Cutthroat", b"ADJ_InoshishiBandit", b"ADJ_InoshishiWarlord", b"ADJ_NinjPig", b"ADJ_WharfRat", b"ADJ_Troggy", b"ADJ_TroggyArcher", b"ADJ_TroggyChief", b"ADJ_TroggyShaman", b"ADJ_TroggyWarrior", b"ADJ_Undead", b"ADJ_WaterMole", b"ADJ_WaterMole_Rebel", b"ADJ_Waponi", b"ADJ_Ophidian", b"ADJ_Vulture", b"ADJ_GNT_MR_Mob", b"ADJ_GNT_MR_Brute", b"ADJ_GNT_MR_Wailer", b"KTArmada", b"ADJ_Event_Boss", b"ADJ_Event_Base", b"ADJ_Event_Elite"]
 
 class Unit:
-    def __init__(self, state: State, obj: dict, curves: list[Curve]):
+    def __init__(self, state: State, obj: dict):
         self.template_id = obj["m_templateID"]
         self.name = state.make_unit_lang_key(obj)
         self.suffix = state.make_lang_key(obj)
@@ -108,7 +97,8 @@ class Unit:
             except:
                 self.image = ""
         self.curve = unit_behavior["m_classId"]
-        self.school = get_curve_class(self.curve, curves)
+        # Resolved against the extracted curves once the scan is done
+        self.school = "Universal"
         self.gender = GENDERS[unit_behavior["m_eGender"]]
         self.faction = unit_behavior["m_factionTemplateID"]
         self.damage_type = STATS[unit_behavior["m_nDamageType"]]
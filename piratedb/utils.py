@@ -1,8 +1,9 @@
 from enum import Enum, IntFlag
+from functools import lru_cache
 from typing import Iterator
 from pathlib import Path
 
-from .deserializer import BinDeserializer
+from .deserializer import get_deserializer
 
 from katsuba.op import * # type: ignore
 
@@ -98,15 +99,13 @@ ROOT = Path(__file__).parent.parent
 ROOT_WAD = ROOT / "Root.wad"
 TYPES = ROOT / "types.json"
 
-de = BinDeserializer(ROOT_WAD, TYPES)
-MANIFEST = de.deserialize_from_path("TemplateManifest.xml")
-CHARACTER_NAMES = de.deserialize_from_path("CharacterNames.xml")
-
-def get_curve_class(id: str, curves: list) -> str:
-    for curve in curves:
-        if curve.template_id == int(id):
-            return curve.school
-    return "Universal"
+# MANIFEST and CHARACTER_NAMES are loaded from the shared deserializer on first access
+def __getattr__(name: str):
+    if name == "MANIFEST":
+        return get_deserializer(ROOT_WAD, TYPES).manifest
+    if name == "CHARACTER_NAMES":
+        return get_deserializer(ROOT_WAD, TYPES).character_names
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def op_to_dict(type_list: TypeList, v):
     if isinstance(v, LazyObject):
@@ -159,16 +158,37 @@ def convert_rarity(obj: dict) -> int:
         return -1
 
 
+FNV_OFFSET = 0xCBF2_9CE4_8422_2325
+FNV_PRIME = 0x0000_0100_0000_01B3
+FNV_MASK = 0xFFFF_FFFF_FFFF_FFFF
+
+def fnv_1a_state(data: bytes, state: int = FNV_OFFSET) -> int:
+    prime = FNV_PRIME
+    mask = FNV_MASK
+    for b in data:
+        state = ((state ^ b) * prime) & mask
+    return state
+
+@lru_cache(maxsize=1 << 16)
 def fnv_1a(data) -> int:
     if isinstance(data, str):
         data = data.encode()
 
-    state = 0xCBF2_9CE4_8422_2325
-    for b in data:
-        state ^= b
-        state *= 0x0000_0100_0000_01B3
-        state &= 0xFFFF_FFFF_FFFF_FFFF
-    return state >> 1
+    return fnv_1a_state(data) >> 1
+
+def get_behavior_names(obj) -> set:
+    try:
+        behaviors = obj["m_behaviors"]
+    except KeyError:
+        return set()
+
+    names = set()
+    for behavior in behaviors:
+        if behavior == None:
+            continue
+
+        names.add(behavior["m_behaviorName"])
+    return names
 
 def iter_lazyobject_keys(types: TypeList, obj: LazyObject):
     iterd_lazyobject = []
@@ -0,0 +1,33 @@
+class VdfRegistry:
+    def __init__(self):
+        # (type, vdf, fallback_icon) -> id, in first-seen order
+        self.ids = {}
+
+    def add(self, vdf_type: str, vdf: str, fallback_icon: str) -> int:
+        key = (vdf_type, vdf, fallback_icon)
+        vdf_id = self.ids.get(key)
+        if vdf_id is None:
+            vdf_id = len(self.ids) + 1
+            self.ids[key] = vdf_id
+        return vdf_id
+
+    def __iter__(self):
+        for (vdf_type, vdf, fallback_icon), vdf_id in self.ids.items():
+            yield vdf_id, vdf_type, vdf, fallback_icon
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def collect_vdfs(scanned: list) -> VdfRegistry:
+    vdfs = VdfRegistry()
+    for _, records, _ in scanned:
+        for kind, entity in records:
+            entity.vdf_id = None
+            if kind in ("item", "unit", "pet"):
+                if entity.vdf != "":
+                    entity.vdf_id = vdfs.add(entity.vdf_type, entity.vdf, entity.fallback_icon)
+            elif kind in ("talent", "power"):
+                if entity.image != "":
+                    entity.vdf_id = vdfs.add("Image", entity.vdf, "")
+    return vdfs